@@ -0,0 +1,306 @@
+'''Benchmark suite for the solver and the data-model hot paths.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run [--quick] [--filter SUBSTRING]
+                             [--baseline PATH] [--save-baseline]
+                             [--threshold RATIO]
+
+Every case is run once as a warm-up, then timed --repeat times (the minimal
+and the median wall time are reported), and finally run once more under
+tracemalloc to measure the peak memory. Optimization cases additionally
+report the number of descent iterations, the final gradient norm and whether
+the tolerance was reached.
+
+The results are compared against the baseline stored in --baseline (if it
+exists): a case is reported as a regression if its minimal time or its peak
+memory exceed the baseline by more than --threshold, if it needs more
+iterations than before, or if it no longer reaches the tolerance. In this case
+the exit status is 1.
+With --save-baseline the current results are written to --baseline instead.
+
+Baselines are machine specific, so they should be recorded on the same
+machine which runs the comparison.
+
+'''
+
+import argparse
+import importlib
+import json
+from pathlib import Path
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from hydrosolver.solution import Solution
+from hydrosolver.composition import Composition, nutrients_stencil
+from hydrosolver.optimization import (
+        OptimizationProblem,
+        WLSObjectiveFunctional,
+        optimize,
+        project_simplex,
+        projected_gradient_descent,
+    )
+from hydrosolver import utils
+import hydrosolver.database
+
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+DATABASE_PATH = Path(hydrosolver.database.__file__).parent
+
+TOLERANCE = 10**-10
+
+cases = {}
+
+
+def case(function):
+    '''Registers a generator of benchmark cases.
+
+    The decorated function takes the quick flag and yields pairs (name, run),
+    where run is a callable without arguments. If run returns a dict, its items
+    are reported as additional metrics.
+
+    '''
+    cases[function.__name__] = function
+    return function
+
+
+def synthetic_catalog(size, seed=0):
+    '''Creates a random catalog of compositions and a reachable target.'''
+    rng = np.random.default_rng(seed)
+
+    vectors = rng.random((size, len(nutrients_stencil)))
+    vectors *= rng.random(vectors.shape) < 0.3
+    vectors /= 4 * np.maximum(vectors.sum(axis=1, keepdims=True), 1)
+
+    compositions = [
+            Composition(name=f'Synthetic {i}', vector=vector)
+            for i, vector in enumerate(vectors)
+        ]
+    water = Composition(name='RO water')
+
+    amounts = 0.001 * rng.random(size)
+    target = Solution.dissolve(100, water, compositions, amounts).composition
+    target.name = f'Synthetic target {size}'
+
+    return Solution.dissolve(100, water, compositions), target
+
+
+def descent_metrics(descent):
+    return {
+        'iterations': len(descent) - 1,
+        'cost': float(descent[-1].cost),
+        'grad_norm': float(descent[-1].grad_norm),
+        'converged': bool(descent[-1].grad_norm < TOLERANCE),
+        }
+
+
+def optimization_cases(name, solution_init, composition_target):
+    optimization_problem = OptimizationProblem(
+            solution_init,
+            composition_target,
+            WLSObjectiveFunctional(),
+        )
+
+    def run_descent():
+        return descent_metrics(projected_gradient_descent(
+            optimization_problem, iter_max=1000, tolerance=TOLERANCE))
+
+    def run_optimize():
+        optimize(solution_init, composition_target)
+
+    yield f'projected_gradient_descent[{name}]', run_descent
+    yield f'optimize[{name}]', run_optimize
+
+
+@case
+def simplex(quick):
+    rng = np.random.default_rng(0)
+    sizes = (10, 1000) if quick else (10, 100, 1000, 10**4, 10**5, 10**6)
+
+    for size in sizes:
+        v = rng.normal(size=size)
+        yield f'project_simplex[n={size}]', lambda v=v: project_simplex(v, 1.)
+
+
+@case
+def examples(quick):
+    from hydrosolver.database import howard_resh
+    from hydrosolver.examples import optimization, hakaphos, masterblend
+
+    yield from optimization_cases(
+            'examples.optimization',
+            optimization.solution_init,
+            optimization.composition_target,
+        )
+
+    solution_tank = 0.8 * optimization.solution_optimal
+    yield (
+        'Solution.correct[examples.optimization]',
+        lambda: solution_tank.correct(optimization.composition_target, 30),
+        )
+
+    # the remaining examples only define solutions, optimize them towards
+    # the same target while keeping their ingredients and total mass
+    target = howard_resh['Resh composition for peppers']
+    yield from optimization_cases(
+            'examples.hakaphos', hakaphos.solution_basis_2, target)
+    yield from optimization_cases(
+            'examples.masterblend', masterblend.fruit_bearing, target)
+
+
+@case
+def catalogs(quick):
+    sizes = (10, 100) if quick else (10, 100, 1000, 5000)
+
+    for size in sizes:
+        yield from optimization_cases(
+                f'catalog={size}', *synthetic_catalog(size))
+
+
+@case
+def solutions(quick):
+    sizes = (10, 100) if quick else (10, 100, 1000)
+
+    for size in sizes:
+        solution, _ = synthetic_catalog(size)
+        other, _ = synthetic_catalog(size, seed=1)
+        other.compositions[:size // 2] = solution.compositions[:size // 2]
+
+        yield f'Solution.composition[n={size}]', lambda s=solution: s.composition
+        yield (
+            f'Solution.merge[n={size}]',
+            lambda s=solution, o=other: s.merge(o),
+            )
+
+
+@case
+def database(quick):
+    def run_load_files():
+        for file_path in sorted(DATABASE_PATH.glob('*.yaml')):
+            utils.load_file(file_path)
+
+    def run_import():
+        importlib.reload(hydrosolver.database)
+
+    yield 'utils.load_file[database]', run_load_files
+    yield 'import hydrosolver.database', run_import
+
+
+def measure(run, repeat):
+    '''Measures the wall time and the peak memory of the given callable.'''
+    run()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        metrics = run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'time_min': min(times),
+        'time_median': statistics.median(times),
+        'memory_peak': peak,
+        }
+    if isinstance(metrics, dict):
+        result.update(metrics)
+
+    return result
+
+
+def compare(result, baseline, threshold):
+    '''Returns a list of human-readable regressions of result w.r.t. baseline.'''
+    regressions = []
+
+    for key in ('time_min', 'memory_peak'):
+        if key in baseline and baseline[key] > 0:
+            ratio = result[key] / baseline[key]
+            if ratio > 1 + threshold:
+                regressions.append(f'{key} x{ratio:.2f}')
+
+    if result.get('iterations', 0) > baseline.get('iterations', np.inf):
+        regressions.append(
+            f"iterations {baseline['iterations']} -> {result['iterations']}")
+
+    if baseline.get('converged') and not result.get('converged', True):
+        regressions.append('no longer converged')
+
+    return regressions
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive integer')
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            prog='python -m benchmarks.run',
+            description='Runs the hydrosolver benchmark suite.',
+        )
+    parser.add_argument('--quick', action='store_true',
+                        help='use smaller problem sizes')
+    parser.add_argument('--filter', default='',
+                        help='only run cases containing this substring')
+    parser.add_argument('--repeat', type=positive_int, default=5,
+                        help='number of timed runs per case')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH,
+                        help='path to the baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=.25,
+                        help='tolerated relative slowdown or memory growth')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+
+    results = {}
+    regressed = False
+
+    print(f"{'case':<48}{'min ms':>10}{'median ms':>11}{'peak KiB':>10}"
+          f"{'iter':>6}  vs baseline")
+
+    for generate in cases.values():
+        for name, run in generate(args.quick):
+            if args.filter not in name:
+                continue
+
+            result = results[name] = measure(run, args.repeat)
+
+            if name in baseline:
+                regressions = compare(result, baseline[name], args.threshold)
+                status = ', '.join(regressions) if regressions else 'ok'
+                regressed |= bool(regressions)
+            else:
+                status = '-'
+
+            print(
+                f"{name:<48}"
+                f"{10**3 * result['time_min']:10.3f}"
+                f"{10**3 * result['time_median']:11.3f}"
+                f"{result['memory_peak'] / 2**10:10.1f}"
+                f"{result.get('iterations', ''):>6}"
+                f"  {status}"
+            )
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=4) + '\n')
+        print(f'Baseline saved to {args.baseline}.')
+
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
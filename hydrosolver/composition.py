@@ -1,5 +1,4 @@
 import numpy as np
-from tabulate import tabulate
 
 
 nutrients_stencil = [
@@ -98,6 +97,8 @@ class Composition:
         return {self.name: nutrients_dict}
 
     def table(self, sparse=True, ref=None, tablefmt='simple'):
+        from tabulate import tabulate
+
         description = f'Composition: {self.name}'
 
         nutrients = np.array(nutrients_stencil)
@@ -0,0 +1,321 @@
+'''This module provides bulk export of compositions and solutions in machine
+readable formats.
+
+Unlike Composition.table and Solution.as_table_plain, which are meant for
+displaying a single object, the routines here operate directly on the
+underlying numpy arrays, so that thousands of results can be exported without
+rendering any tables.
+
+Routines:
+    compositions_to_arrays
+    solutions_to_arrays
+
+    Convert a sequence of compositions or solutions into a dict of columnar
+    numpy arrays.
+
+    to_csv
+    to_jsonl
+
+    Stream an iterable of compositions or solutions into a text file chunk by
+    chunk.
+
+    to_npz
+
+    Write compositions or solutions into a columnar .npz bundle. The arrays
+    of the whole bundle are kept in memory until they are written.
+
+All exported amounts are ratios (kg per kg), i.e. the raw values of
+Composition.vector, and the nutrient columns follow
+composition.nutrients_stencil.
+
+'''
+
+from contextlib import contextmanager
+from itertools import chain, islice
+import json
+
+import numpy as np
+
+from .composition import Composition, nutrients_stencil
+
+
+def compositions_to_arrays(compositions):
+    '''Converts compositions into columnar arrays.
+
+    Parameters:
+        compositions ([Composition]):
+            The compositions to convert.
+
+    Returns:
+        arrays (dict):
+            'name': np.array(str) of shape (n,) with the composition names,
+            'vector': np.array(float) of shape (n, len(nutrients_stencil)).
+
+    '''
+    compositions = list(compositions)
+
+    return {
+        'name': np.array([c.name for c in compositions], dtype=str),
+        'vector': np.array(
+            [c.vector for c in compositions], dtype=float,
+            ).reshape(-1, len(nutrients_stencil)),
+        }
+
+
+def solutions_to_arrays(solutions):
+    '''Converts solutions into columnar arrays.
+
+    Since the solutions may consist of different numbers of compositions, the
+    formulations are stored in a flat (ragged) layout: the compositions of the
+    i-th solution are composition[offset[i]:offset[i + 1]] and their masses
+    are formulation[offset[i]:offset[i + 1]].
+
+    Parameters:
+        solutions ([Solution]):
+            The solutions to convert.
+
+    Returns:
+        arrays (dict):
+            'mass': np.array(float) of shape (n,) with the total masses,
+            'vector': np.array(float) of shape (n, len(nutrients_stencil))
+                with the resulting compositions,
+            'offset': np.array(int) of shape (n + 1,),
+            'composition': np.array(str) with the composition names,
+            'formulation': np.array(float) with the composition masses in kg.
+
+    '''
+    solutions = list(solutions)
+
+    lengths = np.array([len(s.formulation) for s in solutions], dtype=int)
+    offset = np.concatenate(([0], np.cumsum(lengths)))
+
+    formulation = np.concatenate(
+        [s.formulation for s in solutions] + [np.zeros(0)]
+        ).astype(float)
+    composition = np.array(
+        [c.name for s in solutions for c in s.compositions], dtype=str)
+    vectors = np.array(
+        [c.vector for s in solutions for c in s.compositions], dtype=float,
+        ).reshape(-1, len(nutrients_stencil))
+
+    # the unnormalized resulting compositions A @ x of all solutions at once
+    index = np.repeat(np.arange(len(solutions)), lengths)
+    weighted = np.zeros((len(solutions), len(nutrients_stencil)))
+    np.add.at(weighted, index, vectors * formulation[:, np.newaxis])
+    mass = np.bincount(
+        index, weights=formulation, minlength=len(solutions)).astype(float)
+
+    vector = np.zeros_like(weighted)
+    np.divide(weighted, mass[:, np.newaxis], out=vector,
+              where=mass[:, np.newaxis] != 0)
+
+    return {
+        'mass': mass,
+        'vector': vector,
+        'offset': offset,
+        'composition': composition,
+        'formulation': formulation,
+        }
+
+
+def _chunked(items, chunk_size):
+    '''Yields lists of at most chunk_size consecutive items.'''
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _to_arrays(chunk):
+    if isinstance(chunk[0], Composition):
+        return compositions_to_arrays(chunk)
+    else:
+        return solutions_to_arrays(chunk)
+
+
+@contextmanager
+def _open(file, mode):
+    if hasattr(file, 'write'):
+        yield file
+    else:
+        with open(file, mode) as f:
+            yield f
+
+
+def _str_dtype(names):
+    return np.dtype(f'U{max(map(len, names), default=0) or 1}')
+
+
+def _csv_quote(names):
+    return np.char.add('"', np.char.add(np.char.replace(names, '"', '""'), '"'))
+
+
+def to_csv(file, items, chunk_size=1024, fmt='%.17g'):
+    '''Writes compositions or solutions into a CSV file.
+
+    For compositions each row contains the name followed by the nutrient
+    ratios. For solutions each row contains the index of the solution, its
+    total mass in kg and the ratios of the resulting composition. The
+    formulations of the solutions are not written, use to_jsonl or to_npz if
+    they are needed.
+
+    Parameters:
+        file (str, Path or file object):
+            The destination.
+        items ([Composition] or [Solution]):
+            An iterable of compositions or an iterable of solutions.
+        chunk_size (int):
+            Number of items converted to arrays at once.
+        fmt (str):
+            Format of the numeric values. The default one preserves the values
+            exactly (round-trip precision).
+
+    '''
+    chunks = _chunked(items, chunk_size)
+    first = next(chunks, None)
+
+    with _open(file, 'w') as f:
+        if first is None:
+            return
+
+        is_composition = isinstance(first[0], Composition)
+        leading = ['name'] if is_composition else ['solution', 'mass']
+        f.write(','.join(_csv_quote(np.array(leading + nutrients_stencil)))
+                + '\n')
+
+        index = 0
+        for chunk in chain([first], chunks):
+            arrays = _to_arrays(chunk)
+            n = len(chunk)
+
+            if is_composition:
+                table = np.empty((n, 1 + len(nutrients_stencil)), dtype=object)
+                table[:, 0] = _csv_quote(arrays['name'])
+                table[:, 1:] = arrays['vector']
+                fmt_leading = ['%s']
+            else:
+                table = np.column_stack((
+                    np.arange(index, index + n),
+                    arrays['mass'],
+                    arrays['vector'],
+                    ))
+                fmt_leading = ['%d', fmt]
+
+            np.savetxt(
+                f, table, delimiter=',',
+                fmt=fmt_leading + len(nutrients_stencil) * [fmt],
+                )
+            index += n
+
+
+def to_jsonl(file, items, chunk_size=1024):
+    '''Writes compositions or solutions into a JSON Lines file.
+
+    Every composition is written as {"name": ..., "vector": [...]}, every
+    solution as
+    {"mass": ..., "vector": [...], "composition": [...], "formulation": [...]},
+    where "vector" follows composition.nutrients_stencil, "composition" lists
+    the names of the compositions of the solution and "formulation" their
+    masses in kg in the same order (names are not necessarily unique).
+
+    Parameters:
+        file (str, Path or file object):
+            The destination.
+        items ([Composition] or [Solution]):
+            An iterable of compositions or an iterable of solutions.
+        chunk_size (int):
+            Number of items converted to arrays at once.
+
+    '''
+    encoder = json.JSONEncoder()
+
+    with _open(file, 'w') as f:
+        for chunk in _chunked(items, chunk_size):
+            arrays = _to_arrays(chunk)
+            vectors = arrays['vector'].tolist()
+
+            if isinstance(chunk[0], Composition):
+                lines = (
+                    encoder.encode({'name': name, 'vector': vector})
+                    for name, vector in zip(arrays['name'].tolist(), vectors)
+                    )
+            else:
+                names = arrays['composition'].tolist()
+                amounts = arrays['formulation'].tolist()
+                offset = arrays['offset'].tolist()
+                lines = (
+                    encoder.encode({
+                        'mass': mass,
+                        'vector': vector,
+                        'composition': names[start:stop],
+                        'formulation': amounts[start:stop],
+                        })
+                    for mass, vector, start, stop in zip(
+                        arrays['mass'].tolist(), vectors,
+                        offset[:-1], offset[1:])
+                    )
+
+            f.write('\n'.join(lines) + '\n')
+
+
+def to_npz(file, items, chunk_size=1024, compressed=False):
+    '''Writes compositions or solutions into a columnar .npz bundle.
+
+    The bundle contains the arrays returned by compositions_to_arrays or
+    solutions_to_arrays respectively, and an additional array 'nutrients'
+    with composition.nutrients_stencil. It can be read with numpy.load.
+
+    The arrays of the bundle are allocated at once and filled chunk by chunk,
+    so the whole bundle (but no intermediate copy of it) is kept in memory.
+
+    Parameters:
+        file (str, Path or file object):
+            The destination.
+        items ([Composition] or [Solution]):
+            An iterable of compositions or an iterable of solutions.
+        chunk_size (int):
+            Number of items converted to arrays at once.
+        compressed (bool):
+            Whether to use numpy.savez_compressed instead of numpy.savez.
+
+    '''
+    items = list(items)
+    n = len(items)
+
+    if not items:
+        arrays = {}
+    elif isinstance(items[0], Composition):
+        arrays = {
+            'name': np.empty(n, dtype=_str_dtype(c.name for c in items)),
+            'vector': np.empty((n, len(nutrients_stencil))),
+            }
+    else:
+        lengths = np.array([len(s.formulation) for s in items], dtype=int)
+        offset = np.concatenate(([0], np.cumsum(lengths)))
+        arrays = {
+            'mass': np.empty(n),
+            'vector': np.empty((n, len(nutrients_stencil))),
+            'offset': offset,
+            'composition': np.empty(offset[-1], dtype=_str_dtype(
+                c.name for s in items for c in s.compositions)),
+            'formulation': np.empty(offset[-1]),
+            }
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        part = _to_arrays(items[start:stop])
+
+        for key, value in part.items():
+            if key == 'offset':
+                continue
+            elif key in ('composition', 'formulation'):
+                arrays[key][offset[start]:offset[stop]] = value
+            else:
+                arrays[key][start:stop] = value
+
+    arrays['nutrients'] = np.array(nutrients_stencil)
+
+    savez = np.savez_compressed if compressed else np.savez
+    savez(file, **arrays)
@@ -5,6 +5,7 @@ Classes:
     ObjectiveFunctional
     WLSObjectiveFunctional
     OptimizationProblem
+    CorrectionProblem
     OptimizationWaypoint
 
     One can see that the classes ObjectiveFunctional, OptimizationProblem, and
@@ -25,6 +26,11 @@ End user interfaces:
     Performs optimization based on weighted least square objective functional
     with default parameters.
 
+    correct
+
+    Finds nonnegative additions to a solution which move its composition towards
+    the target composition while the existing formulation is kept fixed.
+
 Exceptions:
     DescendLoopException
     DescendToleranceException
@@ -39,13 +45,13 @@ import numpy as np
 from . import composition
 
 
-parser = argparse.ArgumentParser()
+parser = argparse.ArgumentParser(add_help=False)
 parser.add_argument(
         '--log-level',
         default=40,
         type=lambda value: int(value),
     )
-args = parser.parse_args()
+args, _ = parser.parse_known_args()
 
 
 logger = logging.getLogger(__name__)
@@ -108,6 +114,40 @@ class OptimizationProblem:
         return self.objective_functional.grad(self.A, self.b, x)
 
 
+class CorrectionProblem(OptimizationProblem):
+    '''Defines the problem of correcting a solution by additions.
+
+    The formulation of the solution is fixed and only the added masses x of
+    the dosable compositions (the columns index of the solution) are
+    optimized, subject to x >= 0 and sum(x) = mass_added, i.e. on the simplex
+    mass_added * delta(n). The resulting solution has the composition
+    (A_solution @ formulation + A @ x) / (mass + mass_added).
+
+    '''
+    def __init__(
+            self,
+            solution,
+            composition_target,
+            mass_added,
+            objective_functional,
+            index=None,
+            ):
+
+        A_solution = solution.A
+        if index is None:
+            index = np.arange(len(solution.formulation))
+
+        self.index = np.asarray(index, dtype=int)
+        self.A = A_solution[:, self.index]
+        self.b = (
+            (solution.mass + mass_added) * composition_target.vector
+            - A_solution @ solution.formulation
+        )
+        self.x_init = np.zeros(len(self.index))
+        self.x_init[-1] = mass_added
+        self.objective_functional = objective_functional
+
+
 class OptimizationWaypoint:
     '''Provides a point (an iteration) of iterative optimization process with
     convenient interfaces and caching.'''
@@ -271,4 +311,104 @@ def optimize(solution_init, composition_target, weights=None):
         )
     descent = projected_gradient_descent(optimization_problem)
 
-    return solution_init.spawn(descent[-1].x) 
+    return solution_init.spawn(descent[-1].x)
+
+
+def correct(
+        solution,
+        composition_target,
+        mass_added,
+        weights=None,
+        compositions=None,
+        ):
+    '''Provides a high-level end user interface for correcting a solution by
+    additions.
+
+    Parameters:
+        solution (Solution):
+            The current solution. Its formulation is kept fixed.
+        composition_target (Composition):
+            The desired composition after the correction.
+        mass_added (float):
+            Total mass of the additions in kg. The last of the dosable
+            compositions (typically the water) takes the mass which is not
+            needed for the other ones.
+        weights (array_like(float)):
+            Weights to pass to the WLSObjectiveFunctional.
+        compositions ([Composition]):
+            The distinct compositions of the solution which can be added. By
+            default all of them, including e.g. a measured runoff contained in
+            the solution, which therefore must be excluded explicitly.
+
+    Returns:
+        solution_dose (Solution)
+            A solution of the same compositions as solution which formulation
+            gives the masses to add (zero for the compositions which are not
+            dosable). The corrected solution is solution + solution_dose.
+
+    Raises:
+        ValueError:
+            If mass_added is not positive, or if compositions is empty,
+            contains duplicates or compositions which are not contained in the
+            solution.
+
+    '''
+
+    if not mass_added > 0:
+        raise ValueError('The added mass must be positive.')
+
+    if compositions is None:
+        index = None
+    elif len(compositions) == 0:
+        raise ValueError('At least one composition must be dosable.')
+    elif not all(c in solution.compositions for c in compositions):
+        raise ValueError(
+            'Only compositions of the solution can be added.')
+    else:
+        # compositions are compared by their vectors, hence duplicates
+        # (or distinct compositions with equal vectors) share a column
+        index = [solution.compositions.index(c) for c in compositions]
+        if len(set(index)) != len(index):
+            raise ValueError(
+                'The dosable compositions must be distinct.')
+
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+
+    objective_functional = WLSObjectiveFunctional(weights)
+    correction_problem = CorrectionProblem(
+            solution,
+            composition_target,
+            mass_added,
+            objective_functional,
+            index,
+        )
+
+    # Warm start from the weighted least squares solution where the last
+    # dosable composition is eliminated by the mass constraint and the others
+    # are clipped to the simplex. For the small systems at hand it is usually
+    # close to the optimum, so the descent needs just a few iterations.
+    A = correction_problem.A
+    b = correction_problem.b
+    w = np.sqrt(objective_functional.weights)[:, np.newaxis]
+
+    x_ = np.linalg.lstsq(
+            w * (A[:, :-1] - A[:, -1:]),
+            w[:, 0] * (b - mass_added * A[:, -1]),
+            rcond=None,
+        )[0]
+    x_ = np.maximum(x_, 0)
+    if x_.sum() > mass_added:
+        x_ *= mass_added / x_.sum()
+
+    correction_problem.x_init = project_simplex(
+            np.concatenate((x_, [mass_added - x_.sum()])),
+            mass_added,
+        )
+
+    descent = projected_gradient_descent(correction_problem)
+
+    formulation_dose = np.zeros(len(solution.formulation))
+    formulation_dose[correction_problem.index] = descent[-1].x
+
+    return solution.spawn(formulation_dose)
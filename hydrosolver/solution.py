@@ -1,5 +1,4 @@
 import numpy as np
-from tabulate import tabulate
 
 from .composition import Composition
 
@@ -86,6 +85,8 @@ class Solution:
         return self.as_table_plain()
 
     def as_table_plain(self):
+        from tabulate import tabulate
+
         lines = [
                     [composition.name, amount, amount * 10**3]
                     for (composition, amount)
@@ -192,3 +193,40 @@ class Solution:
             solution.add(composition, amount, align=False)
 
         return solution
+
+    def correct(
+            self,
+            composition_target,
+            mass_added,
+            weights=None,
+            compositions=None,
+            ):
+        '''Finds the additions which move the composition of the solution
+        towards the target composition.
+
+        Only the added masses of the dosable compositions are optimized, the
+        current formulation is kept fixed (see optimization.correct).
+
+        Parameters:
+            composition_target (Composition):
+                The desired composition after the correction.
+            mass_added (float):
+                Total mass of the additions in kg, aligned by the last dosable
+                composition (typically water).
+            weights (array_like(float)):
+                Weights of the nutrients in the objective functional.
+            compositions ([Composition]):
+                The distinct compositions of the solution which can be added.
+                By default all of them are dosable, so a measured runoff
+                contained in the solution must be excluded here.
+
+        Returns:
+            solution_dose (Solution):
+                The additions as a solution of the same compositions, i.e. the
+                corrected solution is self + solution_dose.
+
+        '''
+        from .optimization import correct
+
+        return correct(
+                self, composition_target, mass_added, weights, compositions)